@@ -2,7 +2,7 @@
 Production-grade FastAPI server for Document Analyzer microservice.
 
 Features:
-- Async file upload and processing
+- Async file upload with background processing via a Redis job queue
 - Structured JSON logging
 - Health/readiness probes
 - Error handling with proper HTTP status codes
@@ -12,96 +12,32 @@ Features:
 
 import os
 import uuid
-import time
+import importlib.util
+import asyncio
 import logging
-import sys
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, BinaryIO
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers
+from brotli_asgi import BrotliMiddleware
 from pydantic import BaseModel, Field
+import orjson
+import redis.asyncio as redis
 import uvicorn
+from uvicorn_worker import UvicornWorker
 
-from document_analyzer import DocumentAnalyzer
+from config import Config, setup_logging, job_key
 
-
-# ============================================================================
-# Configuration
-# ============================================================================
-
-class Config:
-    """Application configuration from environment variables."""
-
-    # Server
-    HOST: str = os.getenv("HOST", "0.0.0.0")
-    PORT: int = int(os.getenv("PORT", "8000"))
-    WORKERS: int = int(os.getenv("WORKERS", "1"))
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
-
-    # Storage
-    OUTPUT_DIR: Path = Path(os.getenv("OUTPUT_DIR", "/app/data/output"))
-    TEMP_DIR: Path = Path(os.getenv("TEMP_DIR", "/app/data/temp"))
-    MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", "100"))
-
-    # Processing
-    DOCLING_CACHE_DIR: str = os.getenv("DOCLING_CACHE_DIR", "/app/.docling")
-
-    # CORS
-    CORS_ORIGINS: str = os.getenv("CORS_ORIGINS", "*")
-
-    @classmethod
-    def setup_directories(cls):
-        """Ensure required directories exist."""
-        cls.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        cls.TEMP_DIR.mkdir(parents=True, exist_ok=True)
-
-
-# ============================================================================
-# Logging Setup
-# ============================================================================
-
-def setup_logging():
-    """Configure structured JSON logging for production."""
-
-    class JSONFormatter(logging.Formatter):
-        """Custom JSON formatter for structured logging."""
-
-        def format(self, record: logging.LogRecord) -> str:
-            log_data = {
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "level": record.levelname,
-                "message": record.getMessage(),
-                "module": record.module,
-                "function": record.funcName,
-                "line": record.lineno,
-            }
-
-            # Add exception info if present
-            if record.exc_info:
-                log_data["exception"] = self.formatException(record.exc_info)
-
-            # Add extra fields
-            if hasattr(record, 'job_id'):
-                log_data["job_id"] = record.job_id
-
-            import json
-            return json.dumps(log_data)
-
-    # Configure root logger
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(JSONFormatter())
-
-    logger = logging.getLogger()
-    logger.handlers.clear()
-    logger.addHandler(handler)
-    logger.setLevel(getattr(logging, Config.LOG_LEVEL.upper()))
-
-    # Reduce noise from dependencies
-    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
+# Resolved once at import. Only the package spec is looked up: importing
+# docling would pull torch and the model stack into the API process, which
+# never runs conversions itself.
+DOCLING_AVAILABLE = importlib.util.find_spec("docling") is not None
 
 
 # ============================================================================
@@ -118,15 +54,23 @@ class HealthResponse(BaseModel):
 class ReadinessResponse(BaseModel):
     """Readiness check response."""
     status: str = Field(..., description="Readiness status")
-    docling_ready: bool = Field(..., description="Docling converter ready")
+    docling_ready: bool = Field(..., description="Docling available")
     storage_ready: bool = Field(..., description="Storage accessible")
+    queue_ready: bool = Field(..., description="Job queue reachable")
+
+
+class JobResponse(BaseModel):
+    """Queued analysis job."""
+    job_id: str = Field(..., description="Unique job identifier")
+    status: str = Field(..., description="Job status: pending")
+    status_url: str = Field(..., description="URL to poll for the job status")
 
 
 class AnalysisResult(BaseModel):
     """Analysis job result."""
     job_id: str = Field(..., description="Unique job identifier")
-    status: str = Field(..., description="Job status: completed, failed")
-    processing_time_seconds: float = Field(..., description="Time taken to process")
+    status: str = Field(..., description="Job status: pending, processing, completed, failed")
+    processing_time_seconds: Optional[float] = Field(None, description="Time taken to process")
     results: Optional[Dict[str, Any]] = Field(None, description="Processing results")
     error: Optional[str] = Field(None, description="Error message if failed")
 
@@ -140,6 +84,10 @@ async def lifespan(app: FastAPI):
     """Application lifecycle management."""
     logger = logging.getLogger(__name__)
 
+    # Gunicorn workers import the app without going through main()
+    if not logging.getLogger().handlers:
+        setup_logging()
+
     # Startup
     logger.info("Starting Document Analyzer API service")
     Config.setup_directories()
@@ -147,31 +95,88 @@ async def lifespan(app: FastAPI):
     logger.info(f"Temp directory: {Config.TEMP_DIR}")
     logger.info(f"Max file size: {Config.MAX_FILE_SIZE_MB}MB")
 
-    # Test Docling import
-    try:
-        from docling.document_converter import DocumentConverter
-        _ = DocumentConverter()
-        logger.info("Docling DocumentConverter initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize Docling: {e}")
+    # Models are loaded by the workers that run the analysis; the API only
+    # records whether Docling is installed so readiness probes stay cheap.
+    app.state.docling_ready = DOCLING_AVAILABLE
+    if DOCLING_AVAILABLE:
+        logger.info("Docling available")
+    else:
+        logger.error("Docling is not installed")
+
+    # Analysis runs in worker.py; the API only enqueues jobs
+    app.state.redis = redis.from_url(Config.REDIS_URL, decode_responses=True)
+    logger.info(f"Job queue: {Config.JOB_QUEUE_KEY}")
 
     yield
 
     # Shutdown
     logger.info("Shutting down Document Analyzer API service")
+    await app.state.redis.aclose()
 
 
 # ============================================================================
 # FastAPI Application
 # ============================================================================
 
+class CompressionMiddleware:
+    """
+    Brotli for clients that accept it, gzip otherwise.
+
+    Exactly one encoder wraps each request, so responses are never
+    double-encoded, and gzip keeps a moderate level (brotli-asgi's own
+    gzip fallback is fixed at level 9).
+    """
+
+    def __init__(self, app, minimum_size: int):
+        self.brotli = BrotliMiddleware(app, quality=4, minimum_size=minimum_size, gzip_fallback=False)
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=5)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "br" in Headers(scope=scope).get("accept-encoding", ""):
+            await self.brotli(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
 app = FastAPI(
     title="Document Analyzer API",
     description="Production-grade microservice for PDF document analysis using Docling",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+
+@app.middleware("http")
+async def validate_upload_headers(request: Request, call_next):
+    """
+    Reject uploads by their declared Content-Type and Content-Length before
+    the body is read.
+
+    FastAPI parses the whole multipart body before the handler runs, so these
+    checks have to happen here to avoid receiving and spooling the bytes.
+    """
+    if request.method == "POST" and request.url.path == "/api/v1/analyze":
+        # Media types are case-insensitive; the route only accepts multipart form uploads
+        content_type = request.headers.get("content-type", "").lower()
+        if not content_type.startswith("multipart/form-data"):
+            return ORJSONResponse(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                content={"detail": "Expected a multipart/form-data PDF upload"},
+            )
+
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and (
+            int(content_length) > Config.MAX_FILE_SIZE_BYTES + Config.MULTIPART_OVERHEAD_BYTES
+        ):
+            return ORJSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": f"File size exceeds {Config.MAX_FILE_SIZE_MB}MB limit"},
+            )
+
+    return await call_next(request)
+
+
 # CORS middleware
 cors_origins = Config.CORS_ORIGINS.split(",") if Config.CORS_ORIGINS != "*" else ["*"]
 app.add_middleware(
@@ -182,6 +187,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression
+app.add_middleware(CompressionMiddleware, minimum_size=Config.COMPRESSION_MIN_SIZE)
+
 
 # ============================================================================
 # Health Endpoints
@@ -209,21 +217,20 @@ async def readiness_check():
     Returns 200 if the service is ready to handle requests.
     Used by Kubernetes readiness probe.
     """
-    logger = logging.getLogger(__name__)
-
-    # Check if Docling is ready
-    docling_ready = False
-    try:
-        from docling.document_converter import DocumentConverter
-        _ = DocumentConverter()
-        docling_ready = True
-    except Exception as e:
-        logger.warning(f"Docling not ready: {e}")
+    # Check if Docling is ready (determined once at startup)
+    docling_ready = app.state.docling_ready
 
     # Check if storage is accessible
     storage_ready = Config.OUTPUT_DIR.exists() and Config.TEMP_DIR.exists()
 
-    if not (docling_ready and storage_ready):
+    # Check if the job queue is reachable
+    queue_ready = False
+    try:
+        queue_ready = await app.state.redis.ping()
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Job queue not ready: {e}")
+
+    if not (docling_ready and storage_ready and queue_ready):
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Service not ready"
@@ -233,6 +240,7 @@ async def readiness_check():
         status="ready",
         docling_ready=docling_ready,
         storage_ready=storage_ready,
+        queue_ready=queue_ready,
     )
 
 
@@ -240,29 +248,90 @@ async def readiness_check():
 # Analysis Endpoints
 # ============================================================================
 
-@app.post("/api/v1/analyze", response_model=AnalysisResult, tags=["Analysis"])
+def _persist_upload(src: BinaryIO, dest: Path) -> int:
+    """
+    Persist a spooled upload to dest and return its size in bytes.
+
+    Starlette spools uploads into a SpooledTemporaryFile that rolls to disk
+    past 1MB. On Linux and other POSIX systems the rolled spool has no path
+    (it is unlinked, or an unnamed O_TMPFILE), so the payload is still copied
+    once, in the kernel with sendfile rather than through Python buffers.
+    Only on Windows, where the spool keeps a filesystem path, is it
+    hard-linked into place instead. A small in-memory spool, or a platform
+    without sendfile, is copied through Python.
+    """
+    src.seek(0, os.SEEK_END)
+    size = src.tell()
+    src.seek(0)
+
+    # Windows only: on POSIX the rolled spool is unlinked and its name is an int fd
+    name = getattr(src, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        try:
+            os.link(name, dest)
+            return size
+        except OSError:
+            pass  # e.g. spool on another filesystem; fall back to copying
+
+    with open(dest, "wb") as dst:
+        # Checking _rolled avoids fileno(), which would force an in-memory spool to disk
+        if hasattr(os, "sendfile") and getattr(src, "_rolled", True):
+            offset = 0
+            try:
+                while offset < size:
+                    sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            except OSError:
+                pass
+
+            if offset == size:
+                return size
+
+            # sendfile failed or stopped short; redo the copy in userspace
+            dst.seek(0)
+            dst.truncate()
+            src.seek(0)
+
+        copied = 0
+        while chunk := src.read(Config.UPLOAD_CHUNK_SIZE):
+            dst.write(chunk)
+            copied += len(chunk)
+
+    if copied != size:
+        raise IOError(f"Upload truncated while saving: wrote {copied} of {size} bytes")
+
+    return size
+
+
+@app.post(
+    "/api/v1/analyze",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Analysis"],
+)
 async def analyze_document(
     file: UploadFile = File(..., description="PDF file to analyze")
 ):
     """
-    Analyze a PDF document.
+    Queue a PDF document for analysis.
 
-    Accepts a PDF file upload and performs:
+    Accepts a PDF file upload and queues it for:
     - Text extraction
     - Table extraction (exported as CSV)
     - Image extraction
     - Markdown conversion
     - Document statistics
 
-    Returns job ID and results with file paths.
+    Returns immediately with a job ID; poll /api/v1/jobs/{job_id} for results.
     """
     logger = logging.getLogger(__name__)
     job_id = str(uuid.uuid4())
-    start_time = time.time()
 
     # Create logger with job_id context
     job_logger = logging.LoggerAdapter(logger, {'job_id': job_id})
-    job_logger.info(f"Starting analysis for file: {file.filename}")
+    job_logger.info(f"Received file for analysis: {file.filename}")
 
     # Validate file type
     if not file.filename.lower().endswith('.pdf'):
@@ -271,95 +340,118 @@ async def analyze_document(
             detail="Only PDF files are supported"
         )
 
-    # Validate file size
-    file_size = 0
-    temp_path = None
+    # Validate file size (Starlette records it while spooling the upload)
+    if file.size is not None and file.size > Config.MAX_FILE_SIZE_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size exceeds {Config.MAX_FILE_SIZE_MB}MB limit"
+        )
+
+    temp_path = Config.TEMP_DIR / f"{job_id}_{file.filename}"
 
     try:
-        # Save uploaded file to temp location
-        temp_path = Config.TEMP_DIR / f"{job_id}_{file.filename}"
+        # Move the spooled upload to the temp location off the event loop;
+        # the worker removes it when done
+        file_size = await asyncio.to_thread(_persist_upload, file.file, temp_path)
 
-        with open(temp_path, 'wb') as f:
-            while chunk := await file.read(8192):  # 8KB chunks
-                file_size += len(chunk)
+        # Check size limit (in case Starlette did not report a size)
+        if file_size > Config.MAX_FILE_SIZE_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File size exceeds {Config.MAX_FILE_SIZE_MB}MB limit"
+            )
 
-                # Check size limit
-                if file_size > Config.MAX_FILE_SIZE_MB * 1024 * 1024:
-                    raise HTTPException(
-                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                        detail=f"File size exceeds {Config.MAX_FILE_SIZE_MB}MB limit"
-                    )
+        job_logger.info(f"File saved to temp: {temp_path} ({file_size} bytes)")
 
-                f.write(chunk)
+        # Record the job and push it onto the queue atomically
+        key = job_key(job_id)
+        async with app.state.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={
+                "status": "pending",
+                "filename": file.filename,
+                "pdf_path": str(temp_path),
+                "output_dir": str(Config.OUTPUT_DIR / job_id),
+                "created_at": datetime.utcnow().isoformat() + "Z",
+            })
+            pipe.expire(key, Config.JOB_TTL_SECONDS)
+            pipe.rpush(Config.JOB_QUEUE_KEY, job_id)
+            await pipe.execute()
+
+        job_logger.info("Job queued")
+
+        return JobResponse(
+            job_id=job_id,
+            status="pending",
+            status_url=f"/api/v1/jobs/{job_id}",
+        )
 
-        job_logger.info(f"File saved to temp: {temp_path} ({file_size} bytes)")
+    except Exception as e:
+        # Nothing will process the upload, so don't leave it behind
+        if temp_path.exists():
+            try:
+                temp_path.unlink()
+                job_logger.info(f"Cleaned up temp file: {temp_path}")
+            except Exception as cleanup_error:
+                job_logger.warning(f"Failed to cleanup temp file: {cleanup_error}")
 
-        # Create job-specific output directory
-        job_output_dir = Config.OUTPUT_DIR / job_id
-        job_output_dir.mkdir(parents=True, exist_ok=True)
+        if isinstance(e, HTTPException):
+            raise
 
-        # Run document analysis with job-specific output directory
-        job_logger.info("Initializing DocumentAnalyzer")
-        analyzer = DocumentAnalyzer(str(temp_path), output_dir=job_output_dir)
+        job_logger.error(f"Failed to queue job: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Failed to queue document for analysis"
+        )
 
-        job_logger.info("Starting document processing")
 
-        # Run analysis (synchronous for now)
-        try:
-            analyzer.analyze()
-        except Exception as e:
-            job_logger.error(f"Analysis failed: {e}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Document analysis failed: {str(e)}"
-            )
+async def _get_job(job_id: str) -> Dict[str, str]:
+    """Fetch a job's state from Redis or raise 404."""
+    job = await app.state.redis.hgetall(job_key(job_id))
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found"
+        )
+    return job
 
-        # Collect results
-        output_stem = Path(temp_path).stem
-        results = {
-            "job_id": job_id,
-            "markdown_path": str(job_output_dir / f"{output_stem}.md"),
-            "summary_path": str(job_output_dir / f"{output_stem}_summary.json"),
-            "tables": [],
-            "images_dir": str(job_output_dir / f"{output_stem}_images"),
-        }
 
-        # Find generated table files
-        for csv_file in job_output_dir.glob(f"{output_stem}_table_*.csv"):
-            results["tables"].append(str(csv_file))
+@app.get("/api/v1/jobs/{job_id}", response_model=AnalysisResult, tags=["Analysis"])
+async def get_job(job_id: str):
+    """
+    Get the status of an analysis job.
 
-        processing_time = time.time() - start_time
-        job_logger.info(f"Analysis completed in {processing_time:.2f}s")
+    Includes the results once the job has completed, or the error if it failed.
+    """
+    job = await _get_job(job_id)
 
-        return AnalysisResult(
-            job_id=job_id,
-            status="completed",
-            processing_time_seconds=round(processing_time, 2),
-            results=results,
-        )
+    processing_time = job.get("processing_time_seconds")
+    results = job.get("results")
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        job_logger.error(f"Unexpected error: {e}", exc_info=True)
+    return AnalysisResult(
+        job_id=job_id,
+        status=job["status"],
+        processing_time_seconds=float(processing_time) if processing_time else None,
+        results=orjson.loads(results) if results else None,
+        error=job.get("error"),
+    )
 
-        processing_time = time.time() - start_time
 
-        return AnalysisResult(
-            job_id=job_id,
-            status="failed",
-            processing_time_seconds=round(processing_time, 2),
-            error=str(e),
+@app.get("/api/v1/jobs/{job_id}/assets", tags=["Analysis"])
+async def get_job_assets(job_id: str):
+    """
+    Get the output file paths of a completed analysis job.
+
+    Returns 409 while the job is still pending or processing, or if it failed.
+    """
+    job = await _get_job(job_id)
+
+    if job["status"] != "completed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job {job_id} is {job['status']}"
         )
 
-    finally:
-        # Cleanup temp file
-        if temp_path and temp_path.exists():
-            try:
-                temp_path.unlink()
-                job_logger.info(f"Cleaned up temp file: {temp_path}")
-            except Exception as e:
-                job_logger.warning(f"Failed to cleanup temp file: {e}")
+    return orjson.loads(job["results"])
 
 
 @app.get("/", tags=["Root"])
@@ -372,6 +464,7 @@ async def root():
         "docs": "/docs",
         "health": "/health",
         "api": "/api/v1/analyze",
+        "jobs": "/api/v1/jobs/{job_id}",
     }
 
 
@@ -385,7 +478,7 @@ async def global_exception_handler(request, exc):
     logger = logging.getLogger(__name__)
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "error": "Internal server error",
@@ -398,8 +491,40 @@ async def global_exception_handler(request, exc):
 # Main Entry Point
 # ============================================================================
 
+class UvloopWorker(UvicornWorker):
+    """Gunicorn worker pinned to uvloop and httptools, like the single-process path."""
+
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "loop": "uvloop", "http": "httptools"}
+
+
+def _exec_gunicorn():
+    """Replace this process with gunicorn supervising uvicorn workers."""
+    args = [
+        "gunicorn", "api_server:app",
+        "--worker-class", "api_server.UvloopWorker",
+        "--workers", str(Config.WORKERS),
+        "--bind", f"{Config.HOST}:{Config.PORT}",
+        "--timeout", str(Config.WORKER_TIMEOUT),
+        "--log-level", Config.LOG_LEVEL.lower(),
+    ]
+
+    # Heartbeat files on tmpfs avoid disk syncs stalling workers
+    if os.path.isdir("/dev/shm"):
+        args += ["--worker-tmp-dir", "/dev/shm"]
+
+    if Config.LOG_LEVEL.upper() == "DEBUG":
+        args += ["--access-logfile", "-"]
+
+    os.execvp("gunicorn", args)
+
+
 def main():
-    """Run the FastAPI application with uvicorn."""
+    """Run the FastAPI application with uvicorn, under gunicorn when WORKERS > 1."""
+    # Gunicorn restarts crashed or hung workers, which uvicorn's own
+    # multi-process mode does not
+    if Config.WORKERS > 1:
+        _exec_gunicorn()
+
     setup_logging()
 
     logger = logging.getLogger(__name__)
@@ -411,9 +536,11 @@ def main():
         "api_server:app",
         host=Config.HOST,
         port=Config.PORT,
-        workers=Config.WORKERS,
+        loop="uvloop",
+        http="httptools",
         log_level=Config.LOG_LEVEL.lower(),
-        access_log=True,
+        # Per-request access logging is hot-path overhead; keep it for debugging
+        access_log=Config.LOG_LEVEL.upper() == "DEBUG",
     )
 
 
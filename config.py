@@ -0,0 +1,144 @@
+"""
+Shared configuration, logging and Redis key helpers for the Document Analyzer
+API server and queue worker.
+
+Kept free of FastAPI and Docling imports so the worker and its analysis
+processes can load it cheaply.
+"""
+
+import os
+import time
+import socket
+import logging
+import logging.handlers
+import queue
+import atexit
+import sys
+from pathlib import Path
+
+import orjson
+
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+class Config:
+    """Application configuration from environment variables."""
+
+    # Server
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    WORKERS: int = int(os.getenv("WORKERS", str(max(2, os.cpu_count() or 1))))
+    WORKER_TIMEOUT: int = int(os.getenv("WORKER_TIMEOUT", "300"))
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+
+    # Storage
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1 MiB
+    OUTPUT_DIR: Path = Path(os.getenv("OUTPUT_DIR", "/app/data/output"))
+    TEMP_DIR: Path = Path(os.getenv("TEMP_DIR", "/app/data/temp"))
+    MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", "100"))
+    MAX_FILE_SIZE_BYTES: int = MAX_FILE_SIZE_MB * 1024 * 1024
+    # Allowance for multipart boundaries and part headers around the file
+    MULTIPART_OVERHEAD_BYTES: int = 64 * 1024
+
+    # Processing
+    DOCLING_CACHE_DIR: str = os.getenv("DOCLING_CACHE_DIR", "/app/.docling")
+    ANALYSIS_WORKERS: int = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+
+    # Job queue
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    JOB_QUEUE_KEY: str = os.getenv("JOB_QUEUE_KEY", "docling:jobs")
+    JOB_TTL_SECONDS: int = int(os.getenv("JOB_TTL_SECONDS", "86400"))
+    # Runs allowed per job; a job whose analysis process keeps dying is failed
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+    # Identifies this worker's in-flight list; must be stable across restarts
+    WORKER_ID: str = os.getenv("WORKER_ID", socket.gethostname())
+
+    # Response compression
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+    # CORS
+    CORS_ORIGINS: str = os.getenv("CORS_ORIGINS", "*")
+
+    @classmethod
+    def setup_directories(cls):
+        """Ensure required directories exist."""
+        cls.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        cls.TEMP_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def job_key(job_id: str) -> str:
+    """Redis key of the hash holding a job's state."""
+    return f"docling:job:{job_id}"
+
+
+# ============================================================================
+# Logging Setup
+# ============================================================================
+
+def setup_logging():
+    """Configure structured JSON logging for production."""
+
+    class JSONFormatter(logging.Formatter):
+        """Custom JSON formatter for structured logging."""
+
+        _cached_second: int = -1
+        _cached_prefix: str = ""
+
+        def _timestamp(self, created: float) -> str:
+            """ISO-8601 UTC timestamp, re-running strftime only once per second."""
+            second = int(created)
+            if second != self._cached_second:
+                self._cached_second = second
+                self._cached_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            return f"{self._cached_prefix}.{int((created - second) * 1000):03d}Z"
+
+        def format(self, record: logging.LogRecord) -> str:
+            log_data = {
+                "timestamp": self._timestamp(record.created),
+                "level": record.levelname,
+                "message": record.getMessage(),
+                "module": record.module,
+                "function": record.funcName,
+                "line": record.lineno,
+            }
+
+            # Add exception info if present
+            if record.exc_info:
+                log_data["exception"] = self.formatException(record.exc_info)
+
+            # Add extra fields
+            if hasattr(record, 'job_id'):
+                log_data["job_id"] = record.job_id
+
+            return orjson.dumps(log_data).decode()
+
+    class DeferredQueueHandler(logging.handlers.QueueHandler):
+        """Queue handler that defers JSON encoding to the listener thread."""
+
+        def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+            # Resolve the message now so later mutation of args can't change it;
+            # exc_info stays on the record for the JSONFormatter to render.
+            record.msg = record.getMessage()
+            record.args = None
+            return record
+
+    # Formatting and the stdout write happen on a background listener thread,
+    # keeping both off the request path.
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JSONFormatter())
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    # Configure root logger
+    logger = logging.getLogger()
+    logger.handlers.clear()
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    logger.setLevel(getattr(logging, Config.LOG_LEVEL.upper()))
+
+    # Reduce noise from dependencies
+    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
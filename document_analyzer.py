@@ -1,36 +1,86 @@
 from docling.document_converter import DocumentConverter
+from docling.datamodel.base_models import DocumentStream
 from pathlib import Path
+from typing import Optional
+import io
+import csv
+import asyncio
 import json
+import logging
 from datetime import datetime
 import fitz  # PyMuPDF
 
+logger = logging.getLogger(__name__)
+
 
 class DocumentAnalyzer:
-    def __init__(self, pdf_path: str, output_dir: Path = Path("output")):
+    def __init__(self, pdf_path: str, output_dir: Path = Path("output"),
+                 converter: Optional[DocumentConverter] = None):
         self.pdf_path = pdf_path
-        self.output_dir = output_dir
-        self.converter = DocumentConverter()
+        self.stem = Path(pdf_path).stem
+        self.output_dir = Path(output_dir)
+        self.images_dir = self.output_dir / f"{self.stem}_images"
+        # Created once here rather than re-checked by every _save_* method
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Reuse an injected converter when available; building one loads the ML models
+        self.converter = converter or DocumentConverter()
         self.result = None
         self.doc = None
+        self._fitz_doc = None
+        # Paths of the files written by analyze(), so callers needn't scan output_dir
+        self.artifacts = {
+            "tables": [],
+            "markdown": None,
+            "summary": None,
+            "images_dir": None,
+        }
 
     def analyze(self):
-        """ Run complete analysis on the PDF document. """
-        print(f"Starting analysis for: {self.pdf_path}\n")
-
-        # Convert the PDF file
-        self.result = self.converter.convert(self.pdf_path)
-        self.doc = self.result.document
+        """ Run complete analysis on the PDF document and return its artifacts. """
+        return asyncio.run(self.analyze_async())
 
-        #gather stats
-        stats = self._get_statistics()
+    async def analyze_async(self):
+        """ Run complete analysis, writing the independent outputs concurrently. """
+        logger.debug("Starting analysis for: %s", self.pdf_path)
 
-        # Extract components
-        self._save_tables()
-        self._save_images()
-        self._save_markdown()
-        self._create_summary_report(stats)
+        # Read the PDF once; Docling and PyMuPDF both parse from this buffer
+        # instead of each re-reading the file from disk.
+        pdf_bytes = Path(self.pdf_path).read_bytes()
 
-        print("Analysis complete.")
+        # Convert the PDF file
+        source = DocumentStream(name=Path(self.pdf_path).name, stream=io.BytesIO(pdf_bytes))
+        self.result = await asyncio.to_thread(self.converter.convert, source)
+        self.doc = self.result.document
+        del source
+
+        # Open the fitz document only now so it isn't resident during the
+        # (long) conversion; from here on it holds the only reference to the bytes.
+        self._fitz_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        del pdf_bytes
+
+        try:
+            #gather stats
+            stats = self._get_statistics()
+
+            # Extract components; the writers are independent disk I/O, so run
+            # them side by side. Wait for all of them before the fitz document
+            # is closed below, then surface the first failure.
+            outcomes = await asyncio.gather(
+                asyncio.to_thread(self._save_tables),
+                asyncio.to_thread(self._save_images),
+                asyncio.to_thread(self._save_markdown),
+                asyncio.to_thread(self._create_summary_report, stats),
+                return_exceptions=True,
+            )
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    raise outcome
+        finally:
+            self._fitz_doc.close()
+            self._fitz_doc = None
+
+        logger.debug("Analysis complete for: %s", self.pdf_path)
+        return self.artifacts
 
     def _get_statistics(self):
         """ Gather statistics about the document. """
@@ -54,57 +104,60 @@ class DocumentAnalyzer:
         if self.doc is None:
             raise ValueError("Document not converted yet. Call analyze() first.")
 
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-
+        table_paths = []
         for i, table in enumerate(self.doc.tables):
-            df = table.export_to_dataframe()
-            csv_path = self.output_dir / f"{Path(self.pdf_path).stem}_table_{i+1}.csv"
-            df.to_csv(csv_path, index=False)
-            print(f"Table {i+1} saved to: {csv_path}")
+            csv_path = self.output_dir / f"{self.stem}_table_{i+1}.csv"
+
+            # Write the cell grid straight to CSV rather than building a DataFrame
+            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows([cell.text for cell in row] for row in table.data.grid)
+            table_paths.append(str(csv_path))
+            logger.debug("Table %d saved to: %s", i + 1, csv_path)
+
+        self.artifacts["tables"] = table_paths
 
     def _save_markdown(self):
         """ Extract and save markdown output. """
         if self.result is None:
             raise ValueError("Document not converted yet. Call analyze() first.")
 
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-
         markdown = self.result.document.export_to_markdown()
-        markdown_path = self.output_dir / f"{Path(self.pdf_path).stem}.md"
+        markdown_path = self.output_dir / f"{self.stem}.md"
         with open(markdown_path, 'w', encoding='utf-8') as f:
             f.write(markdown)
-        print(f"Markdown saved to: {markdown_path}")
+        self.artifacts["markdown"] = str(markdown_path)
+        logger.debug("Markdown saved to: %s", markdown_path)
     
     def _create_summary_report(self, stats):
         """ Create and save a summary report as JSON. """
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-
         report = {
             "Analysis Date": datetime.now().isoformat(),
             "Document Statistics": stats
         }
-        report_path = self.output_dir / f"{Path(self.pdf_path).stem}_summary.json"
+        report_path = self.output_dir / f"{self.stem}_summary.json"
         with open(report_path, 'w', encoding='utf-8') as f:
             json.dump(report, f, indent=4)
-        print(f"Summary report saved to: {report_path}")
+        self.artifacts["summary"] = str(report_path)
+        logger.debug("Summary report saved to: %s", report_path)
 
     def _save_images(self):
         """ Extract and save images from PDF. """
-        if self.doc is None:
+        if self.doc is None or self._fitz_doc is None:
             raise ValueError("Document not converted yet. Call analyze() first.")
 
         # Create images directory in output folder
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        images_dir = self.output_dir / f"{Path(self.pdf_path).stem}_images"
-        images_dir.mkdir(parents=True, exist_ok=True)
+        images_dir = self.images_dir
+        images_dir.mkdir(exist_ok=True)
+        self.artifacts["images_dir"] = str(images_dir)
 
         saved_count = 0
-        print("\nExtracting images...")
 
         # I have used PyMuPDF to extract images directly from the PDF ,
         # docling's image extraction is not reliable.
 
-        doc = fitz.open(self.pdf_path)
+        # PyMuPDF isn't thread-safe and holds the GIL while decoding, so
+        # extraction stays a single loop over the already-open document.
+        doc = self._fitz_doc
         for page_num in range(len(doc)):
             page = doc[page_num]
             images = page.get_images()
@@ -113,11 +166,10 @@ class DocumentAnalyzer:
                 base_image = doc.extract_image(xref)
                 image_bytes = base_image["image"]
                 image_ext = base_image["ext"]
-                
+
                 image_path = images_dir / f"page{page_num+1}_img{img_index+1}.{image_ext}"
                 with open(image_path, "wb") as img_file:
                     img_file.write(image_bytes)
-                print(f"Image from page {page_num+1}, index {img_index+1} saved to: {image_path}")
                 saved_count += 1
 
         """ deprecated because docling is not good at extracting images. 
@@ -148,9 +200,10 @@ class DocumentAnalyzer:
                 print(f"Picture {i}: Could not extract - {e}")
         """
         
-        print(f"\n✅ Total images saved: {saved_count}/{len(self.doc.pictures)}")
+        logger.info("Saved %d images (%d pictures detected by Docling)", saved_count, len(self.doc.pictures))
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
     pdf_path = "./data/Managerial-economics.pdf"
     analyzer = DocumentAnalyzer(pdf_path)
     analyzer.analyze()
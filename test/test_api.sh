@@ -162,30 +162,44 @@ else
     ANALYZE_RESPONSE=$(curl -s -w "\n%{http_code}" \
         -X POST "$API_URL/api/v1/analyze" \
         -F "file=@$TEST_PDF" \
-        --max-time 300)
+        --max-time 60)
 
     HTTP_CODE=$(echo "$ANALYZE_RESPONSE" | tail -n1)
     RESPONSE_BODY=$(echo "$ANALYZE_RESPONSE" | sed '$d')
 
-    if [ "$HTTP_CODE" -eq 200 ]; then
-        print_success "PDF analysis completed (HTTP $HTTP_CODE)"
+    if [ "$HTTP_CODE" -eq 202 ]; then
+        print_success "PDF analysis queued (HTTP $HTTP_CODE)"
 
         if [ "$HAS_JQ" = true ]; then
             echo "$RESPONSE_BODY" | jq '.'
 
-            # Extract job details
+            # Poll the job until it finishes
             JOB_ID=$(echo "$RESPONSE_BODY" | jq -r '.job_id')
-            STATUS=$(echo "$RESPONSE_BODY" | jq -r '.status')
-            PROCESSING_TIME=$(echo "$RESPONSE_BODY" | jq -r '.processing_time_seconds')
+            STATUS="pending"
+            for _ in $(seq 1 60); do
+                JOB_RESPONSE=$(curl -s "$API_URL/api/v1/jobs/$JOB_ID")
+                STATUS=$(echo "$JOB_RESPONSE" | jq -r '.status')
+                if [ "$STATUS" = "completed" ] || [ "$STATUS" = "failed" ]; then
+                    break
+                fi
+                sleep 5
+            done
+
+            echo "$JOB_RESPONSE" | jq '.'
+            PROCESSING_TIME=$(echo "$JOB_RESPONSE" | jq -r '.processing_time_seconds')
 
             echo ""
             print_success "Job ID: $JOB_ID"
-            print_success "Status: $STATUS"
+            if [ "$STATUS" = "completed" ]; then
+                print_success "Status: $STATUS"
+            else
+                print_error "Status: $STATUS"
+            fi
             print_success "Processing time: ${PROCESSING_TIME}s"
 
             # Check for output files
-            MARKDOWN_PATH=$(echo "$RESPONSE_BODY" | jq -r '.results.markdown_path')
-            SUMMARY_PATH=$(echo "$RESPONSE_BODY" | jq -r '.results.summary_path')
+            MARKDOWN_PATH=$(echo "$JOB_RESPONSE" | jq -r '.results.markdown_path')
+            SUMMARY_PATH=$(echo "$JOB_RESPONSE" | jq -r '.results.summary_path')
 
             echo ""
             print_info "Generated files:"
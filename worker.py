@@ -0,0 +1,348 @@
+"""
+Background worker for the Document Analyzer microservice.
+
+Pulls job IDs queued by api_server.py from Redis, runs DocumentAnalyzer in a
+process pool and records each job's outcome on its Redis hash, where the
+API's /api/v1/jobs endpoints read it from.
+
+Run one or more of these alongside the API:
+    python worker.py
+"""
+
+import os
+import time
+import signal
+import asyncio
+import logging
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import orjson
+import redis.asyncio as redis
+from docling.document_converter import DocumentConverter
+
+from config import Config, setup_logging, job_key
+from document_analyzer import DocumentAnalyzer
+
+
+# ============================================================================
+# Analysis Execution
+# ============================================================================
+
+# Per-process DocumentConverter, built once by the pool initializer so the
+# Docling models are loaded once per worker process instead of per job.
+_worker_converter = None
+
+# Marker of the job the current analysis process is running, see _on_sigterm.
+_current_marker = None
+
+
+def _marker_path(pdf_path: str) -> Path:
+    """Marker file an analysis process keeps next to the upload while it runs it."""
+    return Path(f"{pdf_path}.running")
+
+
+def _on_sigterm(signum, frame):
+    """Drop the running job's marker, then die of the signal as usual."""
+    # The pool only SIGTERMs its processes when tearing down after one of
+    # them died, so a job whose marker is gone was collateral, not the cause.
+    if _current_marker is not None:
+        _current_marker.unlink(missing_ok=True)
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+def _init_analysis_worker() -> None:
+    """Load the Docling converter once in each analysis process."""
+    global _worker_converter
+
+    # A forked child inherits the parent's asyncio signal setup: a no-op
+    # SIGTERM handler plus the loop's wakeup fd. The pool SIGTERMs siblings
+    # when one process dies, and those signals would be forwarded to the
+    # parent's loop and shut the whole worker down. Install our own SIGTERM
+    # handler; SIGINT (Ctrl-C hits the whole process group) is left to the
+    # parent, which drains in-flight jobs.
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, _on_sigterm)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # A forked child inherits the queue handler but not the listener thread
+    # draining it, so give each process its own logging pipeline.
+    setup_logging()
+
+    _worker_converter = DocumentConverter()
+
+
+def _run_analysis(pdf_path: str, output_dir: str) -> dict:
+    """
+    Run a full document analysis and return the paths it wrote.
+
+    Executed inside the analysis process pool, so it must stay a picklable
+    top-level function and only take plain arguments.
+    """
+    global _current_marker
+
+    _current_marker = _marker_path(pdf_path)
+    _current_marker.touch()
+    try:
+        analyzer = DocumentAnalyzer(
+            pdf_path,
+            output_dir=Path(output_dir),
+            converter=_worker_converter,
+        )
+        return analyzer.analyze()
+    finally:
+        _current_marker.unlink(missing_ok=True)
+        _current_marker = None
+
+
+# ============================================================================
+# Job Processing
+# ============================================================================
+
+class QueueWorker:
+    """
+    Consumes the job queue with at-least-once delivery.
+
+    Jobs are moved atomically from the queue onto this worker's processing
+    list and only removed once their outcome is stored, so a crash or
+    SIGTERM leaves them to be requeued when the worker starts again.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.client = redis.from_url(Config.REDIS_URL, decode_responses=True)
+        self.processing_key = f"{Config.JOB_QUEUE_KEY}:processing:{Config.WORKER_ID}"
+        self.executor = self._new_executor()
+        self._pool_drained = None
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Docling conversion is CPU-bound and GIL-bound, so it runs in separate
+        # processes, which also isolates model memory per process.
+        return ProcessPoolExecutor(
+            max_workers=Config.ANALYSIS_WORKERS,
+            initializer=_init_analysis_worker,
+        )
+
+    def _replace_broken_executor(self, broken: ProcessPoolExecutor) -> asyncio.Future:
+        """
+        Swap in a fresh pool and return a future that resolves once every
+        process of the broken one has exited.
+
+        Only the first job to see the breakage swaps the pool; the others
+        get the same future.
+        """
+        if self.executor is broken:
+            self.logger.error("Analysis process died; restarting the process pool")
+            self.executor = self._new_executor()
+            # Futures fail before the pool terminates the surviving
+            # processes, so join them before anyone inspects job markers
+            self._pool_drained = asyncio.ensure_future(asyncio.to_thread(
+                broken.shutdown, wait=True, cancel_futures=True,
+            ))
+        return self._pool_drained
+
+    async def requeue_orphans(self):
+        """Return jobs left in flight by a previous run of this worker to the queue."""
+        requeued = 0
+        while await self.client.lmove(self.processing_key, Config.JOB_QUEUE_KEY, "RIGHT", "LEFT"):
+            requeued += 1
+        if requeued:
+            self.logger.warning(f"Requeued {requeued} interrupted job(s)")
+
+    async def _finish(self, job_id: str, outcome: dict):
+        """Store a job's outcome and take it off the processing list."""
+        key = job_key(job_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=outcome)
+            # hset recreates the hash if it expired mid-job; keep it bounded
+            pipe.expire(key, Config.JOB_TTL_SECONDS)
+            pipe.lrem(self.processing_key, 1, job_id)
+            await pipe.execute()
+
+    async def _requeue(self, job_id: str):
+        """Put a job back on the queue to be retried."""
+        key = job_key(job_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, "status", "pending")
+            # Same as _finish: hset recreates the hash if it expired mid-job
+            pipe.expire(key, Config.JOB_TTL_SECONDS)
+            pipe.lrem(self.processing_key, 1, job_id)
+            pipe.rpush(Config.JOB_QUEUE_KEY, job_id)
+            await pipe.execute()
+
+    async def process_job(self, job_id: str):
+        """Run one queued job and store its result or error on the job hash."""
+        job_logger = logging.LoggerAdapter(self.logger, {'job_id': job_id})
+
+        key = job_key(job_id)
+        job = await self.client.hgetall(key)
+        if not job or "pdf_path" not in job:
+            # Missing, or only a stub hash recreated by a late status write
+            job_logger.warning("Job not found (expired?), skipping")
+            await self.client.lrem(self.processing_key, 1, job_id)
+            return
+
+        if job["status"] in ("completed", "failed"):
+            # Outcome was stored but the worker stopped before dequeuing it
+            await self.client.lrem(self.processing_key, 1, job_id)
+            return
+
+        temp_path = Path(job["pdf_path"])
+        marker = _marker_path(job["pdf_path"])
+        job_output_dir = Path(job["output_dir"])
+
+        attempts = await self.client.hincrby(key, "attempts", 1)
+        await self.client.hset(key, mapping={
+            "status": "processing",
+            "started_at": datetime.utcnow().isoformat() + "Z",
+        })
+        start_time = time.time()
+
+        if attempts > Config.JOB_MAX_ATTEMPTS:
+            job_logger.error(f"Giving up after {attempts - 1} interrupted attempts")
+            outcome = {
+                "status": "failed",
+                "error": "Document analysis was interrupted repeatedly "
+                         "(analysis process killed, possibly out of memory)",
+            }
+        else:
+            executor = self.executor
+            try:
+                # Run analysis in the process pool so several jobs convert in parallel
+                job_logger.info("Starting document processing")
+                loop = asyncio.get_running_loop()
+                artifacts = await loop.run_in_executor(
+                    executor,
+                    _run_analysis,
+                    str(temp_path),
+                    str(job_output_dir),
+                )
+
+            except BrokenProcessPool:
+                # Some analysis process died (e.g. OOM kill); every job in
+                # flight on that pool lands here. Retry on a fresh pool and
+                # keep the upload for the next attempt.
+                await self._replace_broken_executor(executor)
+                if marker.exists():
+                    # Only the process that died skipped _on_sigterm
+                    marker.unlink(missing_ok=True)
+                    job_logger.warning(f"Analysis process died on attempt {attempts}, requeueing")
+                else:
+                    # Terminated by the pool, or never started: not this job's fault
+                    await self.client.hincrby(key, "attempts", -1)
+                    job_logger.warning("Analysis interrupted by another job's crash, requeueing")
+                await self._requeue(job_id)
+                return
+
+            except Exception as e:
+                job_logger.error(f"Analysis failed: {e}", exc_info=True)
+
+                processing_time = time.time() - start_time
+                outcome = {
+                    "status": "failed",
+                    "processing_time_seconds": round(processing_time, 2),
+                    "error": f"Document analysis failed: {str(e)}",
+                }
+
+            else:
+                # Collect results from the paths the analyzer reported writing
+                results = {
+                    "job_id": job_id,
+                    "markdown_path": artifacts["markdown"],
+                    "summary_path": artifacts["summary"],
+                    "tables": artifacts["tables"],
+                    "images_dir": artifacts["images_dir"],
+                }
+
+                processing_time = time.time() - start_time
+                job_logger.info(f"Analysis completed in {processing_time:.2f}s")
+
+                outcome = {
+                    "status": "completed",
+                    "processing_time_seconds": round(processing_time, 2),
+                    "results": orjson.dumps(results),
+                }
+
+        # Cleanup temp file. Only reached once the job has an outcome: a
+        # cancelled job keeps its upload for when it is requeued.
+        # A marker left by a hard-killed earlier attempt goes with it.
+        marker.unlink(missing_ok=True)
+        if temp_path.exists():
+            try:
+                temp_path.unlink()
+                job_logger.info(f"Cleaned up temp file: {temp_path}")
+            except Exception as e:
+                job_logger.warning(f"Failed to cleanup temp file: {e}")
+
+        await self._finish(job_id, outcome)
+
+    async def run(self):
+        """Consume the job queue until cancelled, then drain in-flight jobs."""
+        # SIGTERM (docker stop, pod eviction) cancels the consume loop so the
+        # finally below lets in-flight jobs finish instead of dying mid-job
+        main_task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, main_task.cancel)
+
+        # Only take jobs off the queue when a pool process is free, so idle
+        # workers on other hosts can pick up the rest.
+        slots = asyncio.Semaphore(Config.ANALYSIS_WORKERS)
+        tasks = set()
+
+        def _on_done(task: asyncio.Task):
+            tasks.discard(task)
+            slots.release()
+            if not task.cancelled() and task.exception():
+                self.logger.error(f"Job task crashed: {task.exception()}")
+
+        self.logger.info(f"Worker {Config.WORKER_ID} started with {Config.ANALYSIS_WORKERS} analysis processes")
+        self.logger.info(f"Listening on queue: {Config.JOB_QUEUE_KEY}")
+
+        try:
+            await self.requeue_orphans()
+
+            while True:
+                await slots.acquire()
+                job_id = await self.client.blmove(
+                    Config.JOB_QUEUE_KEY, self.processing_key, 5, "LEFT", "RIGHT",
+                )
+                if job_id is None:
+                    slots.release()
+                    continue
+
+                task = asyncio.create_task(self.process_job(job_id))
+                tasks.add(task)
+                task.add_done_callback(_on_done)
+
+        except asyncio.CancelledError:
+            self.logger.info(f"Shutdown requested, draining {len(tasks)} in-flight job(s)")
+
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            await self.client.aclose()
+            self.logger.info("Worker stopped")
+
+
+# ============================================================================
+# Main Entry Point
+# ============================================================================
+
+def main():
+    """Run the queue worker."""
+    setup_logging()
+
+    logger = logging.getLogger(__name__)
+    logger.info(f"Redis: {Config.REDIS_URL}")
+    logger.info(f"Log level: {Config.LOG_LEVEL}")
+
+    asyncio.run(QueueWorker().run())
+
+
+if __name__ == "__main__":
+    main()